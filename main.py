@@ -1,68 +1,186 @@
 import tkinter as tk
 from tkinter import ttk, messagebox, filedialog, simpledialog
 from PIL import Image, ImageTk
+from collections import deque
+from contextlib import contextmanager
 import csv
+import io
+import mmap
 import os
+import sys
 
 # Define the CSV file name and headers
 CSV_FILE = './Data/inventory.csv'
 FIELDNAMES = ['ean', 'amount', 'name', 'popular']
 Buttons = ['EAN', 'Antall', 'Navn', 'Populær']
+# Number of rows kept in the Treeview at any time; the rest are paged
+# in on scroll so display cost stays constant for large inventories
+VIEWPORT_ROWS = 40
 
 class InventoryItem:
     """Represents a single inventory item."""
+    __slots__ = ('ean', 'amount', 'name', 'popular')
+
     def __init__(self, ean, amount, name, popular):
         self.ean = ean
-        self.amount = int(amount)
+        self.amount = amount  # callers pass an int; no per-row reparse here
         self.name = name
-        self.popular = popular
+        # Intern the popular flag; it takes only a handful of distinct values
+        self.popular = sys.intern(popular)
 
 class InventoryManager:
     """Manages inventory data loading and saving."""
     def __init__(self, filename):
         self.filename = filename
-        self.items = []
-        self.history = []
-        self.load_inventory()
-
-    def load_inventory(self):
-        """Loads inventory data from the CSV file."""
-        # Create the directory if it doesn't exist
+        self._items = None  # parsed lazily on first access
+        # Cap the undo stack so snapshots cannot grow without bound
+        self.history = deque(maxlen=20)
+        self._dirty = False
+        self._in_batch = False
+        self._free = []  # recycled InventoryItems awaiting reuse
+        self._version = 0  # bumped on every mutation; used to invalidate caches
+        self._ean_to_index = {}
+        self._index_version = -1  # version _ean_to_index was built against
+        self._ensure_file()
+
+    @property
+    def items(self):
+        """The inventory rows; parsed from disk on first access so startup
+        is bounded by widget creation rather than CSV size."""
+        if self._items is None:
+            self.load_inventory()
+        return self._items
+
+    @items.setter
+    def items(self, value):
+        self._items = value
+
+    def _ensure_file(self):
+        """Creates the data directory and CSV (with headers) if missing."""
         dir_name = os.path.dirname(self.filename)
         if dir_name and not os.path.exists(dir_name):
             os.makedirs(dir_name)
 
-        # Create the file with headers if it doesn't exist
         if not os.path.isfile(self.filename):
             with open(self.filename, 'w', newline='', encoding='utf-8') as csvfile:
-                writer = csv.DictWriter(csvfile, fieldnames=FIELDNAMES)
-                writer.writeheader()
-        else:
-            # Load existing data
+                csv.writer(csvfile).writerow(FIELDNAMES)
+
+    def load_inventory(self):
+        """Loads inventory data from the CSV file."""
+        self._ensure_file()
+        # Memory-map the file and split it in C instead of going through
+        # the csv module's Python-level line loop; quoted fields need the
+        # real parser, so fall back to csv.reader when quotes are present
+        with open(self.filename, 'rb') as f:
+            if os.path.getsize(self.filename) > 0:
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                    data = mm[:]
+            else:
+                data = b''
+
+        if b'"' in data:
+            # Quoted fields: use the full csv parser, still on plain tuples
             with open(self.filename, 'r', newline='', encoding='utf-8') as csvfile:
-                reader = csv.DictReader(csvfile)
-                self.items = [
-                    InventoryItem(row['ean'], row['amount'], row['name'], row['popular'])
-                    for row in reader
+                reader = csv.reader(csvfile)
+                next(reader, None)  # skip header
+                self._items = [
+                    InventoryItem(ean, int(amount), name, popular)
+                    for ean, amount, name, popular in reader
                 ]
+        else:
+            lines = data.decode('utf-8').splitlines()
+            rows = [line.split(',') for line in lines[1:] if line]
+            # Convert all amounts in one C-level map pass rather than a
+            # Python-level int() call inside each constructor
+            amounts = map(int, [row[1] for row in rows])
+            self._items = [
+                InventoryItem(row[0], amount, row[2], row[3])
+                for row, amount in zip(rows, amounts)
+            ]
+        # Bump the version so the EAN index and sort caches are rebuilt
+        self._version += 1
 
     def save_inventory(self):
         """Saves inventory data to the CSV file."""
-        with open(self.filename, 'w', newline='', encoding='utf-8') as csvfile:
-            writer = csv.DictWriter(csvfile, fieldnames=FIELDNAMES)
-            writer.writeheader()
-            for item in self.items:
-                writer.writerow({
-                    'ean': item.ean,
-                    'amount': item.amount,
-                    'name': item.name,
-                    'popular': item.popular
-                })
+        # Build the whole payload in memory and write it with one call,
+        # then swap it in with os.replace so a crash mid-save can never
+        # leave a half-written inventory file behind
+        buf = io.StringIO()
+        writer = csv.writer(buf)
+        writer.writerow(FIELDNAMES)
+        # Plain tuples through writerows skip DictWriter's per-row
+        # dict allocation and field reordering
+        writer.writerows(
+            (item.ean, item.amount, item.name, item.popular)
+            for item in self.items
+        )
+        tmp_path = self.filename + '.tmp'
+        with open(tmp_path, 'w', newline='', encoding='utf-8') as csvfile:
+            csvfile.write(buf.getvalue())
+        os.replace(tmp_path, self.filename)
+        self._dirty = False
+        self._version += 1
+
+    def _maybe_save(self):
+        """Saves to disk unless a batch is in progress."""
+        self._dirty = True
+        self._version += 1
+        if not self._in_batch:
+            self.save_inventory()
+
+    @contextmanager
+    def batch(self):
+        """Suppresses intermediate saves; writes the file once on clean exit if anything changed."""
+        self._in_batch = True
+        try:
+            yield self
+        finally:
+            self._in_batch = False
+        # Only reached on clean exit: an exception escaping the batch must
+        # not persist a partially-applied set of mutations
+        if self._dirty:
+            self.save_inventory()
+
+    def index_of(self, ean):
+        """Returns the index of the item with the given EAN, or None.
+
+        The ean-to-index map is rebuilt lazily when the data version has
+        moved on, so repeated lookups between mutations are one dict hit.
+        """
+        if self._index_version != self._version:
+            items = self.items  # may lazily load and bump the version
+            self._ean_to_index = {item.ean: i for i, item in enumerate(items)}
+            self._index_version = self._version
+        return self._ean_to_index.get(ean)
+
+    def _make_item(self, ean, amount, name, popular):
+        """Builds an item, reusing one from the free list when possible."""
+        if self._free:
+            item = self._free.pop()
+            item.ean = ean
+            item.amount = amount
+            item.name = name
+            item.popular = popular
+            return item
+        return InventoryItem(ean, amount, name, popular)
+
+    def _recycle(self, item):
+        """Returns a dropped item to the free list for later reuse."""
+        self._free.append(item)
 
     def save_state(self):
         """Saves a snapshot of the current items for undo functionality."""
-        # Deep copy the current state to avoid reference issues
-        state = [InventoryItem(item.ean, item.amount, item.name, item.popular) for item in self.items]
+        # Snapshot in column layout: four parallel tuples instead of N
+        # cloned objects. The tuples share the existing field values, so
+        # a snapshot allocates four containers rather than one object per
+        # row, and cannot alias live items
+        items = self.items
+        state = (
+            tuple(item.ean for item in items),
+            tuple(item.amount for item in items),
+            tuple(item.name for item in items),
+            tuple(item.popular for item in items),
+        )
         self.history.append(state)
 
     def undo(self):
@@ -71,50 +189,79 @@ class InventoryManager:
             messagebox.showwarning("Angre", "Ingenting å angre")
             return
 
-        # Restore the last saved state
-        self.items = self.history.pop()
+        # Restore the last saved state from its column snapshot
+        eans, amounts, names, populars = self.history.pop()
+        self.items = [
+            self._make_item(ean, amount, name, popular)
+            for ean, amount, name, popular in zip(eans, amounts, names, populars)
+        ]
+        self._version += 1
         self.save_inventory()
 
 
     def add_item(self, item):
         """Adds a new item to the inventory."""
         self.items.append(item)
-        self.save_inventory()
+        self._maybe_save()
 
     def update_item(self, index, item):
         """Updates an existing inventory item."""
+        old_item = self.items[index]
         self.items[index] = item
-        self.save_inventory()
+        self._recycle(old_item)
+        self._maybe_save()
 
     def delete_item(self, index):
         """Deletes an item from the inventory."""
+        item = self.items[index]
         del self.items[index]
-        self.save_inventory()
+        self._recycle(item)
+        self._maybe_save()
 
 class InventoryGUI:
     """Creates the GUI for inventory management."""
+    _logo_photo = None
+
+    @classmethod
+    def _load_logo(cls, path='logo'):
+        """Decodes the logo once and reuses the PhotoImage across windows."""
+        if cls._logo_photo is None:
+            cls._logo_photo = ImageTk.PhotoImage(Image.open(path))
+        return cls._logo_photo
+
     def __init__(self, root, manager):
         self.root = root
         self.manager = manager
+        self._view_indices = []
+        self._view_offset = 0
+        self._sort_cache = {}
+        self._sort_reverse = {}
         self.root.title("Bachus lagerbeholdning")
-        logo_path = 'logo'  # Replace with your image file path
-        self.logo_image = Image.open(logo_path)
-        self.logo_photo = ImageTk.PhotoImage(self.logo_image)
+        self.logo_photo = self._load_logo()
 
         # Display the logo at the top of the window
         self.logo_label = tk.Label(self.root, image=self.logo_photo)
         self.logo_label.pack(pady=10)  # Adjust padding as needed
         self.create_widgets()
-        self.load_items()
+        # Defer the first load so the window appears before the CSV is parsed
+        self.root.after(50, self.load_items)
 
     def create_widgets(self):
         """Creates GUI widgets."""
-        # Treeview for displaying inventory
-        self.tree = ttk.Treeview(self.root, columns=Buttons, show='headings')
+        # Treeview for displaying inventory, with a scrollbar that pages
+        # the virtual window rather than scrolling the widget itself
+        tree_frame = tk.Frame(self.root)
+        tree_frame.pack(fill=tk.BOTH, expand=True)
+        self.tree = ttk.Treeview(tree_frame, columns=Buttons, show='headings')
         for field in Buttons:
-            self.tree.heading(field, text=field)
+            self.tree.heading(field, text=field, command=lambda c=field: self.sort_by(c))
             self.tree.column(field, width=100)
-        self.tree.pack(fill=tk.BOTH, expand=True)
+        self.scrollbar = ttk.Scrollbar(tree_frame, orient=tk.VERTICAL, command=self._on_scroll)
+        self.scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        self.tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        self.tree.bind('<MouseWheel>', self._on_mousewheel)
+        self.tree.bind('<Button-4>', self._on_mousewheel)
+        self.tree.bind('<Button-5>', self._on_mousewheel)
 
         # Frame for action buttons
         frame = tk.Frame(self.root)
@@ -140,18 +287,100 @@ class InventoryGUI:
 
     def load_items(self):
         """Loads items into the Treeview."""
-        # Clear existing items
-        for item in self.tree.get_children():
-            self.tree.delete(item)
-        # Insert new items
-        for idx, item in enumerate(self.manager.items):
-            self.tree.insert('', 'end', iid=idx, values=(
+        self._rebuild_all()
+
+    def _rebuild_all(self):
+        """Resets the display order and redraws the visible window (startup, undo, import)."""
+        self._reset_view()
+        self._refresh_viewport()
+
+    def _reset_view(self):
+        """Rebuilds the display-order index list; hook point for future sort/filter."""
+        self._view_indices = list(range(len(self.manager.items)))
+
+    def _refresh_viewport(self):
+        """Syncs the Treeview to the rows currently scrolled into view.
+
+        Only VIEWPORT_ROWS rows are ever inserted; iids are the item's
+        index in manager.items so selections still map straight back.
+        """
+        total = len(self._view_indices)
+        self._view_offset = min(max(self._view_offset, 0), max(0, total - VIEWPORT_ROWS))
+        # Hide the columns while repopulating so Tk does a single layout
+        # pass at the end instead of recomputing after every insert
+        self.tree.configure(displaycolumns=())
+        for iid in self.tree.get_children():
+            self.tree.delete(iid)
+        window = self._view_indices[self._view_offset:self._view_offset + VIEWPORT_ROWS]
+        items = self.manager.items
+        for idx in window:
+            self._insert_row(idx, items[idx])
+        self.tree.configure(displaycolumns=Buttons)
+        # Reflect the window position in the scrollbar
+        if total > 0:
+            self.scrollbar.set(self._view_offset / total, (self._view_offset + len(window)) / total)
+        else:
+            self.scrollbar.set(0.0, 1.0)
+
+    def sort_by(self, column, reverse=None):
+        """Sorts the view by a column header, toggling direction on repeat clicks.
+
+        Sorted index orders are cached per (column, direction, data
+        version), so re-clicking a header on unchanged data reorders the
+        view without re-sorting.
+        """
+        if reverse is None:
+            reverse = not self._sort_reverse.get(column, False)
+        self._sort_reverse[column] = reverse
+        attr = FIELDNAMES[Buttons.index(column)]
+        key = (attr, reverse, self.manager._version)
+        order = self._sort_cache.get(key)
+        if order is None:
+            items = self.manager.items
+            order = sorted(range(len(items)), key=lambda i: getattr(items[i], attr), reverse=reverse)
+            # Drop orders computed against older data versions
+            self._sort_cache = {k: v for k, v in self._sort_cache.items() if k[2] == self.manager._version}
+            self._sort_cache[key] = order
+        self._view_indices = list(order)
+        self._view_offset = 0
+        self._refresh_viewport()
+
+    def _on_scroll(self, action, value, units=None):
+        """Scrollbar callback; moves the virtual window and redraws it."""
+        if action == 'moveto':
+            self._view_offset = int(float(value) * len(self._view_indices))
+        elif action == 'scroll':
+            step = VIEWPORT_ROWS - 1 if units == 'pages' else 1
+            self._view_offset += int(value) * step
+        self._refresh_viewport()
+
+    def _on_mousewheel(self, event):
+        """Routes wheel events to the virtual window instead of the Treeview."""
+        direction = -1 if (getattr(event, 'num', 0) == 4 or event.delta > 0) else 1
+        self._view_offset += direction * 3
+        self._refresh_viewport()
+        return 'break'
+
+    def _insert_row(self, idx, item):
+        """Inserts a single row; one Tcl call instead of a full rebuild."""
+        self.tree.insert('', 'end', iid=idx, values=(
+            item.ean, item.amount, item.name, item.popular
+        ))
+
+    def _update_row(self, idx, item):
+        """Updates a row in place if it is currently in the viewport."""
+        if self.tree.exists(str(idx)):
+            self.tree.item(str(idx), values=(
                 item.ean, item.amount, item.name, item.popular
             ))
 
+    def _delete_row(self, idx):
+        """Drops a row from the view; later indexes shift, so redraw the window."""
+        self._reset_view()
+        self._refresh_viewport()
+
     def add_item(self):
         """Opens a window to add a new item."""
-        self.manager.save_state()
         self.item_window(None)
         
 
@@ -160,11 +389,9 @@ class InventoryGUI:
         selected = self.tree.selection()
         if selected:
             index = int(selected[0])
-            item = self.manager.items[index]
-            self.manager.save_state()
         else:
             ean = simpledialog.askstring("Endre linje", "Legg inn strekkoden til linjen du vil endre:")
-            index = next((i for i, item in enumerate(self.manager.items) if item.ean == ean), None)
+            index = self.manager.index_of(ean)
             if index is None:
                 messagebox.showwarning("Feil EAN", f"Ingen linje med EAN {ean} er funnet i inventaret.")
                 return
@@ -174,31 +401,25 @@ class InventoryGUI:
         selected = self.tree.selection()
         if selected:
             index = int(selected[0])
-            item = self.manager.items[index]
-            item_info = f"EAN: {item.ean}\nAntall: {item.amount}\nNavn: {item.name}\nPopulær: {item.popular}"
-            self.manager.save_state()
-            confirm = messagebox.askyesno("Er du sikker?", f"Sikker på at du vil slette denne linjen?\n\n{item_info}")
-            if confirm:
-                self.manager.delete_item(index)
-                self.load_items()
         else:
             ean = simpledialog.askstring("Slett linje", "Legg inn strekkoden til linjen du vil slette:")
             if not ean:
-                # messagebox.showwarning("Innlegg feil", "Legg inn korekt strekkode")
                 return
-
-            index = next((i for i, item in enumerate(self.manager.items) if item.ean == ean), None)
+            index = self.manager.index_of(ean)
             if index is None:
                 messagebox.showwarning("Feil EAN", f"Ingen linje med EAN {ean} er funnet i inventaret.")
-            return
-
-            item = self.manager.items[index]
-            item_info = f"EAN: {item.ean}\nAntall: {item.amount}\nNavn: {item.name}\nPopulær: {item.popular}"
+                return
+        self._confirm_delete(index)
+
+    def _confirm_delete(self, index):
+        """Asks for confirmation and deletes the item at the given index."""
+        item = self.manager.items[index]
+        item_info = f"EAN: {item.ean}\nAntall: {item.amount}\nNavn: {item.name}\nPopulær: {item.popular}"
+        confirm = messagebox.askyesno("Er du sikker?", f"Sikker på at du vil slette denne linjen?\n\n{item_info}")
+        if confirm:
             self.manager.save_state()
-            confirm = messagebox.askyesno("Er du sikker?", f"Sikker på at du vil slette denne linjen?\n\n{item_info}")
-            if confirm:
-                self.manager.delete_item(index)
-                self.load_items()
+            self.manager.delete_item(index)
+            self._delete_row(index)
 
     def undo(self):
         """Calls the undo function of the manager and refreshes the display."""
@@ -257,12 +478,19 @@ class InventoryGUI:
             except ValueError:
                 messagebox.showwarning("Innlegg feilet", "Må være et heltall.")
                 return
-            new_item = InventoryItem(ean, amount_int, name, popular)
+            # Snapshot only now that the edit is actually going through,
+            # so a cancelled dialog doesn't waste an undo entry
+            self.manager.save_state()
+            new_item = self.manager._make_item(ean, amount_int, name, popular)
             if index is not None:
                 self.manager.update_item(index, new_item)
+                self._update_row(index, new_item)
             else:
                 self.manager.add_item(new_item)
-            self.load_items()
+                # Scroll the window to the end so the new row is visible
+                self._reset_view()
+                self._view_offset = len(self._view_indices)
+                self._refresh_viewport()
             win.destroy()
 
         # Save button
@@ -280,44 +508,78 @@ class InventoryGUI:
 
         try:
             with open(file_path, 'r', newline='', encoding='utf-8') as csvfile:
-                reader = csv.DictReader(csvfile)
-                if reader.fieldnames != ['ean', 'amount', 'name']:
-                    messagebox.showerror("Invalid CSV", "CSV file must have headers: ean, name, amount")
+                reader = csv.reader(csvfile)
+                header = next(reader, None)
+                # Accept any column order and extra columns; only the
+                # required trio has to be present
+                required = {'ean', 'amount', 'name'}
+                if header is None or not required.issubset(header):
+                    messagebox.showerror("Invalid CSV", "CSV file must have headers: ean, amount, name")
                     return
-
-                for row in reader:
-                    ean = row['ean']
-                    amount = row['amount']
-                    name = row['name']
-
-                    try:
-                        amount_int = int(amount)
-                    except ValueError:
-                        messagebox.showwarning("Invalid Data", f"Amount must be an integer for EAN {ean}. Skipping.")
-                        continue
-
-                    # Check if the item exists
-                    existing_item = next((item for item in self.manager.items if item.ean == ean), None)
-                    if existing_item:
-                        # Adjust the amount of the existing item
-                        new_amount = existing_item.amount + amount_int
-                        if new_amount < 0:
-                            messagebox.showwarning("Negative Inventory", f"Resulting amount for EAN {ean} would be negative. Setting amount to 0.")
-                            existing_item.amount = 0
-                        else:
-                            existing_item.amount = new_amount
-                    else:
-                        if amount_int < 0:
-                            messagebox.showwarning("Invalid Amount", f"Cannot add new item with negative amount for EAN {ean}. Skipping.")
+                ean_col = header.index('ean')
+                amount_col = header.index('amount')
+                name_col = header.index('name')
+                popular_col = header.index('popular') if 'popular' in header else None
+                min_cols = max(ean_col, amount_col, name_col) + 1
+
+                # Index items by EAN once so each row is an O(1) lookup
+                # instead of a scan over the whole inventory
+                index_by_ean = {item.ean: item for item in self.manager.items}
+
+                # Collect per-row problems and report them once at the end,
+                # so a file full of bad rows doesn't block on N dialogs
+                skipped = []
+                clamped = []
+                with self.manager.batch():
+                    for row in reader:
+                        # csv.reader yields [] for blank lines; skip them
+                        if not row:
+                            continue
+                        if len(row) < min_cols:
+                            ean = row[ean_col] if len(row) > ean_col else '?'
+                            skipped.append(f"{ean} (too few columns)")
+                            continue
+                        ean = row[ean_col]
+                        name = row[name_col]
+                        try:
+                            amount_int = int(row[amount_col])
+                        except ValueError:
+                            skipped.append(f"{ean} (amount is not an integer)")
                             continue
-                        # Add new item with default popular value 'N'
-                        new_item = InventoryItem(ean, amount_int, name, 'N')
-                        self.manager.items.append(new_item)
 
-                # Save changes and refresh display
-                self.manager.save_inventory()
+                        # Check if the item exists
+                        existing_item = index_by_ean.get(ean)
+                        if existing_item:
+                            # Adjust the amount of the existing item
+                            new_amount = existing_item.amount + amount_int
+                            if new_amount < 0:
+                                clamped.append(ean)
+                                existing_item.amount = 0
+                            else:
+                                existing_item.amount = new_amount
+                        else:
+                            if amount_int < 0:
+                                skipped.append(f"{ean} (negative amount for new item)")
+                                continue
+                            # Use the file's popular column when present, else default to 'N'
+                            popular = row[popular_col] if popular_col is not None and popular_col < len(row) else 'N'
+                            new_item = self.manager._make_item(ean, amount_int, name, popular)
+                            self.manager.items.append(new_item)
+                            # Let later duplicate EANs in the same CSV merge into this item
+                            index_by_ean[ean] = new_item
+                        self.manager._dirty = True
+
+                # The batch context has written all changes in one pass
                 self.load_items()
-                messagebox.showinfo("Import Successful", "CSV file has been imported successfully.")
+                problems = []
+                if clamped:
+                    problems.append(f"Amount set to 0 for {len(clamped)} EAN(s) that would have gone negative: {', '.join(clamped[:10])}")
+                if skipped:
+                    problems.append(f"Skipped {len(skipped)} row(s): {', '.join(skipped[:10])}")
+                if problems:
+                    messagebox.showwarning("Import Completed", "CSV file has been imported.\n\n" + "\n".join(problems))
+                else:
+                    messagebox.showinfo("Import Successful", "CSV file has been imported successfully.")
 
         except Exception as e:
             messagebox.showerror("Error", f"An error occurred while importing the CSV file:\n{e}")